@@ -1,5 +1,6 @@
 import json
 import asyncio
+import re
 from typing import List, Dict, Any, Optional
 import sys
 import os
@@ -41,20 +42,18 @@ llm = ChatOpenAI(
     temperature=0.3
 )
 
+# Common ASIN patterns in Amazon URLs
+ASIN_PATTERNS = [
+    re.compile(r'/dp/([A-Z0-9]{10})'),  # /dp/ASIN
+    re.compile(r'/gp/product/([A-Z0-9]{10})'),  # /gp/product/ASIN
+    re.compile(r'amazon\.com/.*?/([A-Z0-9]{10})'),  # General pattern
+    re.compile(r'[?&]asin=([A-Z0-9]{10})'),  # Query parameter
+]
+
 def extract_asin_from_url(url: str) -> Optional[str]:
     """Extract ASIN from Amazon URL"""
-    import re
-    
-    # Common ASIN patterns in Amazon URLs
-    patterns = [
-        r'/dp/([A-Z0-9]{10})',  # /dp/ASIN
-        r'/gp/product/([A-Z0-9]{10})',  # /gp/product/ASIN
-        r'amazon\.com/.*?/([A-Z0-9]{10})',  # General pattern
-        r'[?&]asin=([A-Z0-9]{10})',  # Query parameter
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, url)
+    for pattern in ASIN_PATTERNS:
+        match = pattern.search(url)
         if match:
             return match.group(1)
     
@@ -205,9 +204,8 @@ async def amazon_search_async(keyword: str, k: int = 5, session_id: Optional[str
 
     print(f"Searching Amazon for keyword: {keyword} (top {k} results)")
     try:
-        # Import the internal async function
-        from amazon_search import _search_amazon_async
-        urls = await _search_amazon_async(keyword, k)
+        from amazon_search import search_amazon_urls_async
+        urls = await search_amazon_urls_async(keyword, k)
         
         # Send completion notification
         if websocket_manager and session_id:
@@ -362,13 +360,11 @@ def amazon_scraper(url: str, session_id: Optional[str] = None) -> str:
 
 def amazon_search(keyword: str, k: int = 5, session_id: Optional[str] = None) -> str:
     """
-    Synchronous Amazon search using sync Playwright.
+    Synchronous Amazon search.
     Search Amazon for products.
     Input: Search keyword and number of results (k)
     Returns: String with top-k Amazon product URLs
     """
-    from playwright.sync_api import sync_playwright
-    
     # Get session_id from context if not provided
     if session_id is None:
         session_id = get_session_id()
@@ -389,66 +385,8 @@ def amazon_search(keyword: str, k: int = 5, session_id: Optional[str] = None) ->
             print(f"WebSocket notification failed: {e}")
 
     print(f"Searching Amazon for keyword: {keyword} (top {k} results)")
-    search_url = f"https://www.amazon.com/s?k={keyword.replace(' ', '+')}"
-    urls = []
-    
     try:
-        with sync_playwright() as p:
-            browser = p.chromium.launch(
-                headless=True,
-                args=['--no-sandbox', '--disable-dev-shm-usage']
-            )
-            
-            context = browser.new_context(
-                user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                viewport={'width': 1920, 'height': 1080}
-            )
-            
-            page = context.new_page()
-            
-            try:
-                page.goto(search_url, wait_until='domcontentloaded', timeout=60000)
-                
-                # Wait for search results with increased timeout
-                page.wait_for_selector('[data-component-type="s-search-result"]', timeout=60000)
-                
-                # Extract search results
-                items = page.query_selector_all('[data-component-type="s-search-result"]')
-                
-                for item in items[:k]:
-                    try:
-                        # Try multiple selectors for product links
-                        selectors = [
-                            'h2 a',
-                            '.a-link-normal',
-                            'a[data-asin]',
-                            'h2 .a-link-normal',
-                            '.s-link-style a'
-                        ]
-                        
-                        title_element = None
-                        for selector in selectors:
-                            title_element = item.query_selector(selector)
-                            if title_element:
-                                break
-                        
-                        if title_element:
-                            href = title_element.get_attribute('href')
-                            if href:
-                                # Convert relative URL to absolute URL
-                                if href.startswith('/'):
-                                    url = f"https://www.amazon.com{href}"
-                                else:
-                                    url = href
-                                urls.append(url)
-                    except:
-                        continue
-                        
-            except Exception as e:
-                print(f"Error during search: {e}")
-            finally:
-                context.close()
-                browser.close()
+        urls = search_amazon_urls(keyword, k)
         
         # Send completion notification
         if websocket_manager and session_id:
@@ -665,7 +603,7 @@ def amazon_search_sequential(keywords: str, k: int = 5, session_id: Optional[str
     
     This function prevents Amazon blocking by:
     - Processing keywords one at a time
-    - Adding random delays between searches (2-4 seconds)
+    - Rate limiting search requests (about one per second, backing off when Amazon throttles)
     - Showing progress for each keyword
     """
     # Get session_id from context if not provided
@@ -735,12 +673,6 @@ def amazon_search_sequential(keywords: str, k: int = 5, session_id: Optional[str
                 
         except Exception as e:
             print(f"    ❌ Error searching for '{keyword}': {e}")
-            
-        # Add delay between searches (except for the last one)
-        if idx < len(keyword_list) - 1:
-            delay = random.uniform(2.0, 4.0)  # Random delay between 2-4 seconds
-            print(f"    ⏱️ Waiting {delay:.1f} seconds before next search...")
-            time.sleep(delay)
     
     # Send completion notification
     if websocket_manager and session_id:
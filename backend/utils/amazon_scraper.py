@@ -6,13 +6,112 @@ using Playwright for reliable browser automation.
 """
 
 import asyncio
+import random
 import re
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime
 import json
 
+import xxhash
 from playwright.async_api import async_playwright, Page, Browser
-from playwright.sync_api import sync_playwright
+
+try:
+    from .rate_limiter import THROTTLED_STATUS_CODES
+    from .request_headers import browser_extra_headers, header_cycle
+except ImportError:
+    from rate_limiter import THROTTLED_STATUS_CODES
+    from request_headers import browser_extra_headers, header_cycle
+
+
+ASIN_RE = re.compile(r'/dp/([A-Z0-9]{10})')
+
+# Attempts made at loading a product page before giving up (503s and captchas are usually transient)
+NAVIGATION_RETRIES = 3
+
+# Injected before any page script runs: hide the webdriver flag and stub Amazon's "P" module
+# loader so deferred twister/recommendation bundles never execute. The extractor only reads
+# server-rendered HTML, which is left intact.
+INIT_JS = """
+Object.defineProperty(navigator, 'webdriver', {get: () => undefined});
+window.ue_backdetect = undefined;
+(() => {
+    const noop = () => {};
+    const chain = () => ({execute: noop});
+    Object.defineProperty(window, 'P', {
+        value: {when: chain, now: chain, register: noop, declare: noop, execute: noop},
+        writable: false
+    });
+})();
+"""
+
+# Join the feature bullet list items in-page, skipping Amazon's "Make sure this fits" nag line
+DESCRIPTION_JS = """
+(items) => items
+    .map(x => x.innerText.trim())
+    .filter(t => t && !t.startsWith('Make sure'))
+    .slice(0, 5)
+    .join(' ')
+"""
+
+# Return [label, value] text for each product detail table row; the label is the first
+# th / td.a-span3 / .a-color-secondary, the value the second matching cell (or the only one)
+SPEC_ROWS_JS = """
+(rows) => rows.map(row => {
+    const label = row.querySelector('th') || row.querySelector('td.a-span3') || row.querySelector('.a-color-secondary');
+    let value = null;
+    for (const selector of ['td', 'td.a-span9', '.a-color-base']) {
+        const cells = row.querySelectorAll(selector);
+        if (cells.length > 1) { value = cells[1]; break; }
+        if (cells.length === 1 && label) { value = cells[0]; break; }
+    }
+    return label && value ? [label.innerText.trim(), value.innerText.trim()] : null;
+}).filter(Boolean)
+"""
+
+# Return the trimmed text of every matched element
+INNER_TEXTS_JS = "(items) => items.map(x => x.innerText.trim())"
+
+# Words that mark a generic page table as a product details table
+SPEC_TABLE_KEYWORDS = ['dimensions', 'weight', 'asin', 'manufacturer', 'material']
+
+# Return [first cell, second cell] text for each row with at least two cells, across
+# every table whose text mentions one of the given keywords
+SPEC_TABLE_ROWS_JS = """
+(tables, keywords) => tables
+    .filter(table => {
+        const text = table.innerText.toLowerCase();
+        return keywords.some(keyword => text.includes(keyword));
+    })
+    .flatMap(table => Array.from(table.querySelectorAll('tr'))
+        .map(row => row.querySelectorAll('td, th'))
+        .filter(cells => cells.length >= 2)
+        .map(cells => [cells[0].innerText.trim(), cells[1].innerText.trim()]))
+"""
+
+# Spec cleanup works on all rows joined into one string; the separators are control
+# characters that are not matched by \s (unlike \x1e / \x1f)
+WHITESPACE_RE = re.compile(r'\s+')
+FIELD_SEPARATOR = '\x00'
+ROW_SEPARATOR = '\x01'
+
+# Full "$1,234.56" style price: optional currency symbol, whole part and optional fraction
+FULL_PRICE_RE = re.compile(r'([€£¥$]?)\s*(\d{1,3}(?:,\d{3})+|\d+)(?:[.,](\d{1,2}))?')
+CURRENCY_SYMBOLS = {'$': 'USD', '€': 'EUR', '£': 'GBP', '¥': 'JPY'}
+
+
+def _parse_price(text: str) -> Tuple[Optional[float], Optional[str]]:
+    """Parse the first price in text into (value, currency code)"""
+    match = FULL_PRICE_RE.search(text)
+    if not match:
+        return None, None
+    
+    symbol, whole, fraction = match.groups()
+    price = float(whole.replace(',', '') + ('.' + fraction if fraction else ''))
+    # Fall back to a symbol anywhere in the text (e.g. "12,99 €"), then to USD
+    currency = CURRENCY_SYMBOLS.get(symbol) or next(
+        (code for sym, code in CURRENCY_SYMBOLS.items() if sym in text), 'USD'
+    )
+    return price, currency
 
 
 class AmazonScraper:
@@ -29,11 +128,6 @@ class AmazonScraper:
         """
         self.headless = headless
         self.data = {}  # Store scraped data for access across methods
-        self.user_agents = [
-            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-        ]
     
     
     async def _extract_product_data(self, page: Page) -> Dict[str, Any]:
@@ -80,7 +174,7 @@ class AmazonScraper:
         
         # ASIN
         try:
-            asin_match = re.search(r'/dp/([A-Z0-9]{10})', page.url)
+            asin_match = ASIN_RE.search(page.url)
             if asin_match:
                 data['asin'] = asin_match.group(1)
         except:
@@ -88,9 +182,11 @@ class AmazonScraper:
         
         # Product Description
         try:
-            desc_element = await page.query_selector('#feature-bullets')
-            if desc_element:
-                data['description'] = (await desc_element.inner_text()).strip()
+            description = await page.eval_on_selector_all(
+                '#feature-bullets span.a-list-item', DESCRIPTION_JS
+            )
+            if description:
+                data['description'] = description
         except:
             pass
         
@@ -116,69 +212,9 @@ class AmazonScraper:
     
     async def _extract_price(self, page: Page) -> Dict[str, Any]:
         """Extract price information"""
-        
-        # First try to get the accurate price from .a-offscreen (Amazon's accessible price)
-        try:
-            offscreen_element = await page.query_selector('.a-price .a-offscreen')
-            if offscreen_element:
-                price_text = await offscreen_element.inner_text()
-                
-                # Extract currency
-                currency = 'USD'
-                if '€' in price_text:
-                    currency = 'EUR'
-                elif '£' in price_text:
-                    currency = 'GBP'
-                elif '¥' in price_text:
-                    currency = 'JPY'
-                
-                # Extract price value - more comprehensive regex
-                price_match = re.search(r'[\d,]+\.?\d*', price_text.replace(',', ''))
-                if price_match:
-                    return {
-                        'price': float(price_match.group()),
-                        'currency': currency
-                    }
-        except:
-            pass
-        
-        # Fallback: Try to combine .a-price-whole and .a-price-fraction
-        try:
-            price_container = await page.query_selector('.a-price')
-            if price_container:
-                whole_element = await price_container.query_selector('.a-price-whole')
-                fraction_element = await price_container.query_selector('.a-price-fraction')
-                
-                if whole_element and fraction_element:
-                    whole_text = await whole_element.inner_text()
-                    fraction_text = await fraction_element.inner_text()
-                    
-                    # Clean the whole part (remove newlines and dots)
-                    whole_clean = re.search(r'\d+', whole_text)
-                    fraction_clean = re.search(r'\d+', fraction_text)
-                    
-                    if whole_clean and fraction_clean:
-                        complete_price = f"{whole_clean.group()}.{fraction_clean.group()}"
-                        
-                        # Extract currency from container
-                        container_text = await price_container.inner_text()
-                        currency = 'USD'
-                        if '€' in container_text:
-                            currency = 'EUR'
-                        elif '£' in container_text:
-                            currency = 'GBP'
-                        elif '¥' in container_text:
-                            currency = 'JPY'
-                        
-                        return {
-                            'price': float(complete_price),
-                            'currency': currency
-                        }
-        except:
-            pass
-        
-        # Final fallback: Try other selectors
         price_selectors = [
+            '.a-price .a-offscreen',  # Amazon's accessible price (most accurate)
+            '.a-price',               # Whole and fraction parts rendered separately
             '.a-price.a-text-price.a-size-medium.apexPriceToPay',
             '.a-price-range',
             '#priceblock_dealprice',
@@ -190,22 +226,12 @@ class AmazonScraper:
             try:
                 price_element = await page.query_selector(selector)
                 if price_element:
-                    price_text = await price_element.inner_text()
-                    
-                    # Extract currency
-                    currency = 'USD'
-                    if '€' in price_text:
-                        currency = 'EUR'
-                    elif '£' in price_text:
-                        currency = 'GBP'
-                    elif '¥' in price_text:
-                        currency = 'JPY'
-                    
-                    # Extract price value
-                    price_match = re.search(r'[\d,]+\.?\d*', price_text.replace(',', ''))
-                    if price_match:
+                    # Drop whitespace so "$12\n.\n99" reads as "$12.99"
+                    price_text = WHITESPACE_RE.sub('', await price_element.inner_text())
+                    price, currency = _parse_price(price_text)
+                    if price is not None:
                         return {
-                            'price': float(price_match.group()),
+                            'price': price,
                             'currency': currency
                         }
             except:
@@ -252,112 +278,62 @@ class AmazonScraper:
             '#detailBullets_feature_div'                # Alternative detail bullets
         ]
         
+        # Collect all (label, value) pairs in-page, one round-trip per section
+        pairs = []
         for section_selector in product_detail_selectors:
             try:
-                section = await page.query_selector(section_selector)
-                if section:
-                    # Look for table rows within this section
-                    rows = await section.query_selector_all('tr')
-                    
-                    for row in rows:
-                        try:
-                            # Try different cell selectors
-                            label_selectors = ['th', 'td.a-span3', '.a-color-secondary']
-                            value_selectors = ['td', 'td.a-span9', '.a-color-base']
-                            
-                            label_element = None
-                            value_element = None
-                            
-                            # Find label element
-                            for selector in label_selectors:
-                                label_element = await row.query_selector(selector)
-                                if label_element:
-                                    break
-                            
-                            # Find value element
-                            for selector in value_selectors:
-                                elements = await row.query_selector_all(selector)
-                                if len(elements) > 1:  # Get the second td element (value)
-                                    value_element = elements[1]
-                                    break
-                                elif len(elements) == 1 and not label_element:
-                                    # If only one element and no label found, skip
-                                    continue
-                                elif len(elements) == 1:
-                                    value_element = elements[0]
-                                    break
-                            
-                            if label_element and value_element:
-                                label = (await label_element.inner_text()).strip()
-                                value = (await value_element.inner_text()).strip()
-                                
-                                # Clean up the label (remove extra whitespace and special chars)
-                                label = re.sub(r'\s+', ' ', label).strip()
-                                value = re.sub(r'\s+', ' ', value).strip()
-                                
-                                # Filter out unwanted entries
-                                if (label and value and 
-                                    len(label) < 100 and len(value) < 500 and
-                                    label.lower() not in ['', 'product information', 'additional information'] and
-                                    not label.startswith('Customer') and
-                                    not label.startswith('Date')):
-                                    
-                                    spec_data.append(f"{label}: {value}")
-                        except:
-                            continue
+                pairs.extend(await page.eval_on_selector_all(f'{section_selector} tr', SPEC_ROWS_JS))
             except:
                 continue
         
+        if pairs:
+            # Clean whitespace for every label and value with a single regex pass
+            joined = ROW_SEPARATOR.join(f"{label}{FIELD_SEPARATOR}{value}" for label, value in pairs)
+            cleaned = WHITESPACE_RE.sub(' ', joined)
+            rows = [row.split(FIELD_SEPARATOR, 1) for row in cleaned.split(ROW_SEPARATOR)]
+            
+            # Filter out unwanted entries
+            spec_data.extend(
+                f"{label}: {value}"
+                for label, value in ((label.strip(), value.strip()) for label, value in rows)
+                if (label and value and
+                    len(label) < 100 and len(value) < 500 and
+                    label.lower() not in ['', 'product information', 'additional information'] and
+                    not label.startswith('Customer') and
+                    not label.startswith('Date'))
+            )
+        
         # Secondary method: Look for specific detail bullet points
         try:
             # Look for the detail bullets structure
-            detail_bullets = await page.query_selector_all('#detailBullets_feature_div ul li')
+            bullet_texts = await page.eval_on_selector_all('#detailBullets_feature_div ul li', INNER_TEXTS_JS)
             
-            for bullet in detail_bullets:
-                try:
-                    bullet_text = (await bullet.inner_text()).strip()
-                    
-                    # Look for key-value patterns in bullet points
-                    if ':' in bullet_text and len(bullet_text) < 200:
-                        # Split on first colon to get key-value pair
-                        parts = bullet_text.split(':', 1)
-                        if len(parts) == 2:
-                            key = parts[0].strip()
-                            value = parts[1].strip()
-                            
-                            if (key and value and 
-                                not key.lower().startswith('customer') and
-                                not key.lower().startswith('date')):
-                                spec_data.append(f"{key}: {value}")
-                except:
-                    continue
+            for bullet_text in bullet_texts:
+                # Look for key-value patterns in bullet points
+                if ':' in bullet_text and len(bullet_text) < 200:
+                    # Split on first colon to get key-value pair
+                    parts = bullet_text.split(':', 1)
+                    if len(parts) == 2:
+                        key = parts[0].strip()
+                        value = parts[1].strip()
+                        
+                        if (key and value and 
+                            not key.lower().startswith('customer') and
+                            not key.lower().startswith('date')):
+                            spec_data.append(f"{key}: {value}")
         except:
             pass
         
         # Tertiary method: Extract from any remaining product details tables
         try:
-            # Look for any table with product information
-            tables = await page.query_selector_all('table')
+            # Read the rows of every table with product information in one round-trip
+            table_rows = await page.eval_on_selector_all('table', SPEC_TABLE_ROWS_JS, SPEC_TABLE_KEYWORDS)
             
-            for table in tables:
-                # Check if this table contains product information
-                table_text = await table.inner_text()
-                if any(keyword in table_text.lower() for keyword in ['dimensions', 'weight', 'asin', 'manufacturer', 'material']):
-                    
-                    rows = await table.query_selector_all('tr')
-                    for row in rows:
-                        try:
-                            cells = await row.query_selector_all('td, th')
-                            if len(cells) >= 2:
-                                label = (await cells[0].inner_text()).strip()
-                                value = (await cells[1].inner_text()).strip()
-                                
-                                if (label and value and 
-                                    len(label) < 100 and len(value) < 200 and
-                                    ':' not in label):  # Avoid duplicate formatting
-                                    spec_data.append(f"{label}: {value}")
-                        except:
-                            continue
+            for label, value in table_rows:
+                if (label and value and 
+                    len(label) < 100 and len(value) < 200 and
+                    ':' not in label):  # Avoid duplicate formatting
+                    spec_data.append(f"{label}: {value}")
         except:
             pass
         
@@ -365,14 +341,14 @@ class AmazonScraper:
         if spec_data:
             # Remove duplicates while preserving order
             unique_specs = []
-            seen = set()
+            seen: set[int] = set()
             
             for spec in spec_data:
-                # Normalize the spec for duplicate detection
-                normalized = spec.lower().strip()
-                if normalized not in seen and len(spec.strip()) > 5:
+                # Fingerprint the normalized spec for duplicate detection
+                fingerprint = xxhash.xxh64_intdigest(spec.strip().lower().encode('utf-8', 'ignore'))
+                if fingerprint not in seen and len(spec.strip()) > 5:
                     unique_specs.append(spec)
-                    seen.add(normalized)
+                    seen.add(fingerprint)
             
             # Return formatted specifications
             if unique_specs:
@@ -459,10 +435,10 @@ class AmazonScraper:
         
         # Remove duplicates while preserving order
         unique_reviews = []
-        seen = set()
+        seen: set[int] = set()
         for review in reviews:
-            # Use first 100 characters as unique identifier
-            review_key = review[:100].lower().strip()
+            # Use a 64-bit fingerprint of the first 200 characters as unique identifier
+            review_key = xxhash.xxh64_intdigest(review[:200].strip().lower().encode('utf-8', 'ignore'))
             if review_key not in seen:
                 unique_reviews.append(review)
                 seen.add(review_key)
@@ -491,45 +467,55 @@ class AmazonScraper:
                 ]
             )
             
-            # Set a random user agent
-            user_agent = self.user_agents[0]
-            context = await browser.new_context(
-                user_agent=user_agent,
-                viewport={'width': 1920, 'height': 1080},
-                locale='en-US'
-            )
-            page: Page = await context.new_page()
-            
-            # Navigate with more lenient settings
-            try:
-                await page.goto(url, wait_until='domcontentloaded', timeout=60000)
-                # Wait a bit for dynamic content
-                await page.wait_for_timeout(2000)
-            except Exception as e:
-                print(f"Navigation error: {e}")
-                # Try without wait_until
-                await page.goto(url, timeout=60000)
-            
-            # Check for and handle "Continue shopping" button
-            try:
-                continue_button = await page.query_selector('button:has-text("Continue shopping")')
-                if continue_button:
-                    print("Found 'Continue shopping' button, clicking it...")
-                    await continue_button.click()
+            for attempt in range(NAVIGATION_RETRIES):
+                # Rotate the user agent and start from a clean cookie jar on every attempt
+                headers = next(header_cycle)
+                context = await browser.new_context(
+                    user_agent=headers['User-Agent'],
+                    viewport={'width': 1920, 'height': 1080},
+                    locale='en-US'
+                )
+                await context.set_extra_http_headers(browser_extra_headers(headers))
+                await context.add_init_script(INIT_JS)
+                page: Page = await context.new_page()
+                
+                try:
+                    response = await page.goto(url, wait_until='domcontentloaded', timeout=60000)
+                    if response and response.status in THROTTLED_STATUS_CODES:
+                        raise RuntimeError(f'Amazon throttled the request with status {response.status}')
+                    
+                    # Wait a bit for dynamic content
                     await page.wait_for_timeout(2000)
-            except:
-                pass
-            
-            try:
-                await page.wait_for_selector('#productTitle', timeout=60000)
-            except Exception as e:
-                print(f"Product page did not load correctly: {e}")
-                print(f"Current URL: {page.url}")
-                # Take a screenshot for debugging
-                await page.screenshot(path='debug_screenshot.png')
-                print("Screenshot saved as debug_screenshot.png")
-                await browser.close()
-                return {'success': False, 'error': f'Page load timeout: {str(e)}'}
+                    
+                    # Check for and handle "Continue shopping" button
+                    try:
+                        continue_button = await page.query_selector('button:has-text("Continue shopping")')
+                        if continue_button:
+                            print("Found 'Continue shopping' button, clicking it...")
+                            await continue_button.click()
+                            await page.wait_for_timeout(2000)
+                    except:
+                        pass
+                    
+                    if 'Robot Check' in await page.title():
+                        raise RuntimeError('Robot Check captcha page served')
+                    
+                    await page.wait_for_selector('#productTitle', timeout=10000)
+                    break
+                except Exception as e:
+                    print(f"Navigation attempt {attempt + 1}/{NAVIGATION_RETRIES} failed: {e}")
+                    if attempt == NAVIGATION_RETRIES - 1:
+                        print(f"Product page did not load correctly: {e}")
+                        print(f"Current URL: {page.url}")
+                        # Take a screenshot for debugging
+                        await page.screenshot(path='debug_screenshot.png')
+                        print("Screenshot saved as debug_screenshot.png")
+                        await browser.close()
+                        return {'success': False, 'error': f'Page load timeout: {str(e)}'}
+                    
+                    await context.close()
+                    # Exponential backoff with jitter: ~0.5s, ~1.5s, ...
+                    await asyncio.sleep(0.5 * (3 ** attempt) + random.random() * 0.5)
             
             self.data = await self._extract_product_data(page)
             await browser.close()
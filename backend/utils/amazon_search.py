@@ -6,91 +6,434 @@ and return a list of product URLs for the top-k results.
 """
 
 import asyncio
-from typing import List
-from playwright.async_api import async_playwright
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Union
 
+import httpx
+from requests import Request
+from requests_cache import CachedSession
+from selectolax.lexbor import LexborHTMLParser
 
-async def _search_amazon_async(keyword: str, k: int = 5) -> List[str]:
+try:
+    from .playwright_manager import playwright_manager
+    from .rate_limiter import THROTTLED_STATUS_CODES, amazon_rate_limiter
+    from .request_headers import header_cycle
+except ImportError:
+    from playwright_manager import playwright_manager
+    from rate_limiter import THROTTLED_STATUS_CODES, amazon_rate_limiter
+    from request_headers import header_cycle
+
+
+# Search result containers, in order of preference
+RESULT_SELECTORS = [
+    '[data-component-type="s-search-result"]',
+    '[data-asin]:not([data-asin=""])'
+]
+
+# Product link selectors tried within each search result: the title link first, then
+# whichever of the other link styles comes first in the result's markup
+LINK_SELECTORS = [
+    'h2 a',
+    '.a-link-normal, a[data-asin], .s-link-style a'
+]
+
+# Last-resort selector for any product link on the page
+PRODUCT_LINK_SELECTOR = 'a[href*="/dp/"]'
+
+# Product ASIN in a product link, used to recognize the same product listed twice
+# (e.g. in a sponsored and an organic slot)
+ASIN_RE = re.compile(r'/dp/([A-Z0-9]{10})')
+
+# Return the href of the first matching product link in each of the top-k unique search
+# results, falling back to the first k unique product links anywhere on the page
+SEARCH_RESULTS_JS = """
+([k, linkSelectors, productLinkSelector]) => {
+    const hrefs = [];
+    const seen = new Set();
+    const add = (href) => {
+        const match = href.match(/\\/dp\\/([A-Z0-9]{10})/);
+        const key = match ? match[1] : href;
+        if (seen.has(key)) return;
+        seen.add(key);
+        hrefs.push(href);
+    };
+    const items = document.querySelectorAll('[data-component-type="s-search-result"]');
+    for (const item of Array.from(items).slice(0, k * 2)) {
+        for (const selector of linkSelectors) {
+            const link = item.querySelector(selector);
+            if (link) {
+                const href = link.getAttribute('href');
+                if (href) add(href);
+                break;
+            }
+        }
+        if (hrefs.length >= k) break;
+    }
+    if (hrefs.length === 0) {
+        for (const link of document.querySelectorAll(productLinkSelector)) {
+            const href = link.getAttribute('href');
+            if (href) add(href);
+            if (hrefs.length >= k) break;
+        }
+    }
+    return hrefs;
+}
+"""
+
+# Milliseconds the browser fallback waits for a search page; a block comes back as a
+# 503 within a second, so a long wait only delays the failure
+GOTO_TIMEOUT = 15000
+
+# Search result pages are stable for minutes, so identical searches are served from a
+# short-lived on-disk cache. Only pages that actually contain results are cached, so a
+# captcha or error page is never replayed. When a refresh fails, a page that expired
+# at most SEARCH_CACHE_TTL seconds ago is served in its place.
+SEARCH_CACHE_TTL = 300
+
+_http_session: Optional[CachedSession] = None
+_http_session_lock = threading.Lock()
+
+
+def get_http_session() -> CachedSession:
+    """Get the shared cached HTTP session, opening its cache on first use"""
+    global _http_session
+    
+    with _http_session_lock:
+        if _http_session is None:
+            _http_session = CachedSession(
+                'amazon_serp_cache',
+                backend='sqlite',
+                use_cache_dir=True,
+                expire_after=SEARCH_CACHE_TTL,
+                allowable_codes=(200,),
+                stale_if_error=SEARCH_CACHE_TTL,
+                filter_fn=lambda response: b'data-component-type="s-search-result"' in response.content
+            )
+        return _http_session
+
+
+# Shared HTTP/2 client for async searches; lives on the browser manager's loop so its
+# connections are reused across callers and closed together with the browser
+_async_client: Optional[httpx.AsyncClient] = None
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Get the shared async HTTP client; must be called on the manager's loop"""
+    global _async_client
+    
+    if _async_client is None:
+        _async_client = httpx.AsyncClient(
+            http2=True,
+            timeout=15.0,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=16)
+        )
+        playwright_manager.on_close(_close_async_client)
+    return _async_client
+
+
+async def _close_async_client():
+    """Close the shared async HTTP client"""
+    global _async_client
+    
+    if _async_client is not None:
+        client, _async_client = _async_client, None
+        await client.aclose()
+
+
+# Worker processes that parse search pages for the async HTTP path, so concurrent
+# searches parse in parallel instead of queueing behind the event loop thread. They are
+# started by a forkserver rather than forked from this multi-threaded process, so they
+# don't inherit the browser driver pipes and HTTP sockets; a few suffice for ~5 ms parses.
+PARSE_WORKERS = min(4, os.cpu_count() or 1)
+
+_parse_pool: Optional[ProcessPoolExecutor] = None
+_parse_pool_lock = threading.Lock()
+
+
+def get_parse_pool() -> ProcessPoolExecutor:
+    """Get the shared search page parsing pool, starting it on first use"""
+    global _parse_pool
+    
+    with _parse_pool_lock:
+        if _parse_pool is None:
+            _parse_pool = ProcessPoolExecutor(
+                max_workers=PARSE_WORKERS,
+                mp_context=multiprocessing.get_context('forkserver')
+            )
+            playwright_manager.on_close(_shutdown_parse_pool)
+        return _parse_pool
+
+
+async def _shutdown_parse_pool():
+    """Stop the search page parsing pool's worker processes"""
+    global _parse_pool
+    
+    with _parse_pool_lock:
+        pool, _parse_pool = _parse_pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _to_absolute_url(href: str) -> str:
+    """Convert a relative Amazon URL to an absolute URL"""
+    if href.startswith('/'):
+        return f"https://www.amazon.com{href}"
+    return href
+
+
+def _parse_search_results(html: Union[str, bytes], k: int) -> List[str]:
     """
-    Asynchronously search Amazon for products and return top-k product URLs.
+    Parse top-k product URLs out of an Amazon search results page.
+    
+    Pure CPU work on picklable arguments, so it can run in the parsing pool.
+    
+    Args:
+        html: Search results page HTML, as text or raw bytes
+        k: Number of results to return
+        
+    Returns:
+        List of product URLs, empty if the page has no recognizable results
+    """
+    tree = LexborHTMLParser(html)
+    urls = []
+    seen: set[str] = set()
+    
+    def add(url: str):
+        match = ASIN_RE.search(url)
+        key = match.group(1) if match else url
+        if key not in seen:
+            seen.add(key)
+            urls.append(url)
+    
+    items = []
+    for selector in RESULT_SELECTORS:
+        items = tree.css(selector)
+        if items:
+            break
+    
+    # Look past the first k results so duplicates can be skipped and still return k
+    for item in items[:k * 2]:
+        asin = item.attributes.get('data-asin')
+        if asin:
+            add(f"https://www.amazon.com/dp/{asin}")
+        else:
+            for selector in LINK_SELECTORS:
+                link = item.css_first(selector)
+                href = link.attributes.get('href') if link else None
+                if href:
+                    add(_to_absolute_url(href))
+                    break
+        if len(urls) >= k:
+            break
+    
+    # Fallback: any product link on the page
+    if not urls:
+        for link in tree.css(PRODUCT_LINK_SELECTOR):
+            add(_to_absolute_url(link.attributes.get('href')))
+            if len(urls) >= k:
+                break
+    
+    return urls
+
+
+def _record_response_status(status_code: int):
+    """Feed a search response status back into the shared rate limiter"""
+    if status_code in THROTTLED_STATUS_CODES:
+        amazon_rate_limiter.record_throttled()
+    elif status_code == 200:
+        amazon_rate_limiter.record_success()
+
+
+def _search_amazon_requests(keyword: str, k: int = 5) -> List[str]:
+    """
+    Search Amazon over plain HTTP and return top-k product URLs.
     
     Args:
         keyword: Search keyword/phrase
         k: Number of results to return
         
     Returns:
-        List of product URLs for top-k search results
+        List of product URLs, empty if the request was blocked or failed
     """
     search_url = f"https://www.amazon.com/s?k={keyword.replace(' ', '+')}"
-    urls = []
     
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(
-            headless=True,
-            args=['--no-sandbox', '--disable-dev-shm-usage']
-        )
+    try:
+        http_session = get_http_session()
+        # Fresh cache hits never reach Amazon, so they skip the rate limit
+        cached = http_session.cache.get_response(http_session.cache.create_key(Request('GET', search_url)))
+        if cached is None or cached.is_expired:
+            amazon_rate_limiter.acquire()
+        response = http_session.get(search_url, headers=next(header_cycle), timeout=15)
+        # Only live responses say anything about how Amazon is treating us right now,
+        # except an expired page served in place of a failed refresh (429/503)
+        if not getattr(response, 'from_cache', False):
+            _record_response_status(response.status_code)
+        elif response.is_expired:
+            amazon_rate_limiter.record_throttled()
+        if response.status_code != 200:
+            print(f"Search request returned status {response.status_code}")
+            return []
+        return _parse_search_results(response.text, k)
+    except Exception as e:
+        print(f"Error during HTTP search: {e}")
+        return []
+
+
+async def _search_amazon_http_async(keyword: str, k: int = 5) -> List[str]:
+    """
+    Search Amazon over HTTP/2 without blocking the event loop.
+    
+    Args:
+        keyword: Search keyword/phrase
+        k: Number of results to return
         
-        context = await browser.new_context(
-            user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            viewport={'width': 1920, 'height': 1080}
+    Returns:
+        List of product URLs, empty if the request was blocked or failed
+    """
+    search_url = f"https://www.amazon.com/s?k={keyword.replace(' ', '+')}"
+    
+    try:
+        await amazon_rate_limiter.acquire_async()
+        response = await get_async_client().get(search_url, headers=next(header_cycle))
+        _record_response_status(response.status_code)
+        if response.status_code != 200:
+            print(f"Search request returned status {response.status_code}")
+            return []
+        # Parse in a worker process; only the fetch stays on the event loop
+        return await asyncio.get_running_loop().run_in_executor(
+            get_parse_pool(), _parse_search_results, response.content, k
         )
+    except Exception as e:
+        print(f"Error during HTTP search: {e}")
+        return []
+
+
+async def _search_amazon_async(keyword: str, k: int = 5, goto_timeout: int = GOTO_TIMEOUT) -> List[str]:
+    """
+    Search Amazon in the shared browser and return top-k product URLs.
+    
+    Args:
+        keyword: Search keyword/phrase
+        k: Number of results to return
+        goto_timeout: Milliseconds to wait for the response, the parsed page and the results
         
+    Returns:
+        List of product URLs for top-k search results
+    """
+    search_url = f"https://www.amazon.com/s?k={keyword.replace(' ', '+')}"
+    urls = []
+    blocked = False
+    
+    context = await playwright_manager.acquire_async_context(headless=True)
+    page = None
+    
+    try:
         page = await context.new_page()
+        await amazon_rate_limiter.acquire_async()
+        # Return as soon as the response starts so a throttled status is caught before
+        # the page body has been downloaded
+        response = await page.goto(search_url, wait_until='commit', timeout=goto_timeout)
+        if response:
+            _record_response_status(response.status)
+            if response.status in THROTTLED_STATUS_CODES:
+                # Don't hand a blocked session to future contexts, and don't wait for
+                # results that a throttled page will never contain
+                blocked = True
+                await playwright_manager.discard_storage_state()
+                return urls
         
-        try:
-            await page.goto(search_url, wait_until='domcontentloaded', timeout=60000)
-            
-            # Wait for search results with increased timeout
-            await page.wait_for_selector('[data-component-type="s-search-result"]', timeout=60000)
-            
-            # Extract search results
-            items = await page.query_selector_all('[data-component-type="s-search-result"]')
-            
-            for item in items[:k]:
-                try:
-                    # Try multiple selectors for product links
-                    selectors = [
-                        'h2 a',
-                        '.a-link-normal',
-                        'a[data-asin]',
-                        'h2 .a-link-normal',
-                        '.s-link-style a'
-                    ]
-                    
-                    title_element = None
-                    for selector in selectors:
-                        title_element = await item.query_selector(selector)
-                        if title_element:
-                            break
-                    
-                    if title_element:
-                        href = await title_element.get_attribute('href')
-                        if href:
-                            # Convert relative URL to absolute URL
-                            if href.startswith('/'):
-                                url = f"https://www.amazon.com{href}"
-                            else:
-                                url = href
-                            urls.append(url)
-                except:
-                    continue
-                    
-        except Exception as e:
-            print(f"Error during search: {e}")
-        finally:
+        # The results HTML may still be streaming after commit; read it only once fully parsed
+        await page.wait_for_load_state('domcontentloaded', timeout=goto_timeout)
+        
+        # Search results are server-rendered, so they are usually in the DOM already;
+        # only wait for them when they aren't. We read attributes, not pixels, so
+        # attached is enough.
+        if await page.locator(RESULT_SELECTORS[0]).count() == 0:
+            await page.wait_for_selector(RESULT_SELECTORS[0], state='attached', timeout=goto_timeout)
+        
+        # Extract all product links in a single round-trip
+        hrefs = await page.evaluate(SEARCH_RESULTS_JS, [k, LINK_SELECTORS, PRODUCT_LINK_SELECTOR])
+        urls = [_to_absolute_url(href) for href in hrefs]
+        if urls:
+            await playwright_manager.save_storage_state(context)
+        
+    except Exception as e:
+        print(f"Error during search: {e}")
+    finally:
+        if page is not None:
+            await page.close()
+        if blocked:
             await context.close()
-            await browser.close()
+        else:
+            await playwright_manager.release_async_context(context)
     
     return urls
 
 
-def search_amazon_urls(keyword: str, k: int = 5) -> List[str]:
+async def search_amazon_urls_async(keyword: str, k: int = 5, goto_timeout: int = GOTO_TIMEOUT) -> List[str]:
+    """
+    Asynchronously search Amazon for products and return top-k product URLs.
+    
+    Tries a plain HTTP/2 request first and only falls back to the shared
+    browser when Amazon blocks it or the page has no parsable results.
+    
+    Args:
+        keyword: Search keyword/phrase
+        k: Number of results to return
+        goto_timeout: Milliseconds the browser fallback waits for the page and its results
+        
+    Returns:
+        List of product URLs for top-k search results
+    """
+    urls = await playwright_manager.run_async(_search_amazon_http_async(keyword, k))
+    if urls:
+        return urls
+    return await playwright_manager.run_async(_search_amazon_async(keyword, k, goto_timeout))
+
+
+async def search_amazon_urls_batch_async(
+    keywords: List[str],
+    k: int = 5,
+    concurrency: int = 8,
+    goto_timeout: int = GOTO_TIMEOUT
+) -> List[Union[List[str], BaseException]]:
+    """
+    Search Amazon for several keywords concurrently over the shared browser.
+    
+    Args:
+        keywords: Search keywords/phrases
+        k: Number of results to return per keyword
+        concurrency: Maximum number of searches in flight at once (gains
+            plateau and timeouts rise beyond ~8-16)
+        goto_timeout: Milliseconds the browser fallback waits for the page and its results
+        
+    Returns:
+        One entry per keyword, in order: its list of product URLs, or the
+        exception raised while searching for it
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def search_one(keyword: str) -> List[str]:
+        async with semaphore:
+            return await search_amazon_urls_async(keyword, k, goto_timeout)
+    
+    return await asyncio.gather(*(search_one(keyword) for keyword in keywords), return_exceptions=True)
+
+
+def search_amazon_urls(keyword: str, k: int = 5, goto_timeout: int = GOTO_TIMEOUT) -> List[str]:
     """
     Search Amazon for products and return top-k product URLs.
     
     Args:
         keyword: Search keyword/phrase
         k: Number of results to return (default: 5)
+        goto_timeout: Milliseconds the browser fallback waits for the page and its
+            results (default: 15000)
         
     Returns:
         List of product URLs for top-k search results
@@ -101,7 +444,12 @@ def search_amazon_urls(keyword: str, k: int = 5) -> List[str]:
         ['https://www.amazon.com/...', 'https://www.amazon.com/...', ...]
     """
     try:
-        return asyncio.run(_search_amazon_async(keyword, k))
+        urls = _search_amazon_requests(keyword, k)
+        if urls:
+            return urls
+        
+        # Blocked or client-rendered page, fall back to the browser
+        return playwright_manager.run(_search_amazon_async(keyword, k, goto_timeout))
     except Exception as e:
         print(f"Error searching Amazon: {str(e)}")
         return []
@@ -120,4 +468,6 @@ if __name__ == "__main__":
         for i, url in enumerate(urls, 1):
             print(f"{i}. {url}")
     else:
-        print("No URLs found.")
\ No newline at end of file
+        print("No URLs found.")
+    
+    playwright_manager.run(playwright_manager.close())
\ No newline at end of file
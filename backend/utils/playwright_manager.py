@@ -0,0 +1,238 @@
+"""
+Playwright Browser Manager
+
+This module keeps a single shared Chromium instance alive across Amazon
+searches so that callers don't pay the browser launch cost on every query.
+"""
+
+import asyncio
+import threading
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, List, Optional
+
+from playwright.async_api import async_playwright, Browser, BrowserContext, Playwright, Route
+
+try:
+    from .request_headers import browser_extra_headers, header_cycle
+except ImportError:
+    from request_headers import browser_extra_headers, header_cycle
+
+
+BROWSER_ARGS = ['--no-sandbox', '--disable-dev-shm-usage']
+
+CONTEXT_OPTIONS = {
+    'viewport': {'width': 1920, 'height': 1080}
+}
+
+# Resource types that search pages never need; the result markup ships in the HTML
+BLOCKED_RESOURCE_TYPES = ('image', 'font', 'media', 'stylesheet')
+
+# Cookies/storage captured after a successful visit, replayed into new contexts so they
+# skip Amazon's first-visit interstitials; refreshed once older than STATE_MAX_AGE seconds
+STATE_PATH = Path('~/.cache/amazon_scraper/state.json').expanduser()
+STATE_MAX_AGE = 6 * 60 * 60
+
+# Maximum number of idle browser contexts kept for reuse
+MAX_CONTEXT_POOL = 4
+
+
+async def _block_heavy_resources(route: Route):
+    """Abort requests for resources that are irrelevant to URL extraction"""
+    if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+        await route.abort()
+    else:
+        await route.continue_()
+
+
+class PlaywrightManager:
+    """
+    Manager for the shared Playwright browser instance
+    """
+
+    def __init__(self):
+        # Background event loop that owns the browser; Playwright objects can only
+        # be used from the loop that created them, so every caller runs there
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_lock = threading.Lock()
+        self._loop_started = threading.Event()
+
+        # Browser state, only touched from the background loop
+        self._async_playwright: Optional[Playwright] = None
+        self._async_browser: Optional[Browser] = None
+        self._async_lock = asyncio.Lock()
+
+        # Idle contexts kept warm (cookies, keep-alive connections) between searches
+        self._async_context_pool: List[BrowserContext] = []
+
+        # Cleanups for other loop-bound resources (e.g. HTTP clients) run by close()
+        self._close_callbacks: List[Callable[[], Awaitable[Any]]] = []
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        """Get the background event loop, starting its thread on first use"""
+        # Fast path: once started the loop never changes, so skip the lock
+        if self._loop_started.is_set():
+            return self._loop
+
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=self._loop.run_forever,
+                    name='playwright-manager',
+                    daemon=True
+                ).start()
+                self._loop_started.set()
+            return self._loop
+
+    def run(self, coro: Awaitable[Any]) -> Any:
+        """
+        Run a coroutine on the manager's background event loop and wait for its result
+
+        Synchronous callers use this instead of asyncio.run() so the browser
+        outlives a single call and is reused by the next one.
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self._get_loop()).result()
+
+    async def run_async(self, coro: Awaitable[Any]) -> Any:
+        """
+        Await a coroutine on the manager's background event loop from any event loop
+
+        Async callers use this so the browser is shared with synchronous callers
+        instead of being relaunched on every new event loop.
+        """
+        loop = self._get_loop()
+        if asyncio.get_running_loop() is loop:
+            return await coro
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+    async def get_async_browser(self, headless: bool = True) -> Browser:
+        """
+        Get the shared browser, launching it on first use or after a crash
+
+        Must be awaited on the manager's loop (see run() and run_async()).
+
+        Args:
+            headless: Whether to run browser in headless mode (only applies at launch)
+        """
+        # Fast path: a live browser doesn't need the launch lock
+        browser = self._async_browser
+        if browser is not None and self._is_connected(browser):
+            return browser
+
+        async with self._async_lock:
+            if self._async_browser is None or not self._is_connected(self._async_browser):
+                if self._async_playwright is None:
+                    self._async_playwright = await async_playwright().start()
+                self._async_browser = await self._async_playwright.chromium.launch(
+                    headless=headless,
+                    args=BROWSER_ARGS
+                )
+            return self._async_browser
+
+    @staticmethod
+    def _is_connected(browser: Browser) -> bool:
+        """Whether the browser is still usable; its process can die between checks"""
+        try:
+            return browser.is_connected()
+        except Exception:
+            return False
+
+    async def acquire_async_context(self, headless: bool = True) -> BrowserContext:
+        """
+        Check out a browser context, reusing an idle one from the pool when possible
+
+        Args:
+            headless: Whether to run browser in headless mode (only applies at launch)
+        """
+        browser = await self.get_async_browser(headless=headless)
+        while self._async_context_pool:
+            context = self._async_context_pool.pop()
+            if context.browser is browser and browser.is_connected():
+                return context
+        # Each new context takes the next header set, so pooled contexts don't all share one identity
+        headers = next(header_cycle)
+        context = await browser.new_context(
+            user_agent=headers['User-Agent'],
+            storage_state=self._fresh_storage_state(),
+            **CONTEXT_OPTIONS
+        )
+        await context.set_extra_http_headers(browser_extra_headers(headers))
+        await context.route('**/*', _block_heavy_resources)
+        return context
+
+    async def release_async_context(self, context: BrowserContext):
+        """Return a browser context to the pool, closing it if the pool is full"""
+        if (len(self._async_context_pool) < MAX_CONTEXT_POOL and
+                context.browser is not None and context.browser.is_connected()):
+            self._async_context_pool.append(context)
+            return
+        try:
+            await context.close()
+        except Exception as e:
+            print(f"Error closing browser context: {e}")
+
+    def _fresh_storage_state(self) -> Optional[str]:
+        """Path of the saved storage state if it exists and has not expired"""
+        try:
+            if time.time() - STATE_PATH.stat().st_mtime < STATE_MAX_AGE:
+                return str(STATE_PATH)
+        except OSError:
+            pass
+        return None
+
+    async def save_storage_state(self, context: BrowserContext):
+        """Persist a context's cookies/storage after a successful visit, unless a fresh copy exists"""
+        if self._fresh_storage_state() is not None:
+            return
+        async with self._async_lock:
+            try:
+                STATE_PATH.parent.mkdir(parents=True, exist_ok=True)
+                await context.storage_state(path=STATE_PATH)
+            except Exception as e:
+                print(f"Error saving browser storage state: {e}")
+
+    async def discard_storage_state(self):
+        """Forget the saved storage state and close pooled contexts carrying it, e.g. after a block"""
+        STATE_PATH.unlink(missing_ok=True)
+        contexts, self._async_context_pool = self._async_context_pool, []
+        for context in contexts:
+            try:
+                await context.close()
+            except Exception as e:
+                print(f"Error closing browser context: {e}")
+
+    def on_close(self, callback: Callable[[], Awaitable[Any]]):
+        """Register a coroutine function that close() awaits on the manager's loop"""
+        self._close_callbacks.append(callback)
+
+    async def close(self):
+        """Close the shared browser and registered resources, from whichever event loop calls it"""
+        if not self._loop_started.is_set():
+            return
+        await self.run_async(self._close())
+
+    async def _close(self):
+        """Close the shared browser; runs on the manager's loop"""
+        callbacks, self._close_callbacks = self._close_callbacks, []
+        for callback in callbacks:
+            try:
+                await callback()
+            except Exception as e:
+                print(f"Error during manager cleanup: {e}")
+
+        async with self._async_lock:
+            self._async_context_pool = []
+            if self._async_browser is not None:
+                try:
+                    await self._async_browser.close()
+                except Exception as e:
+                    print(f"Error closing browser: {e}")
+                self._async_browser = None
+            if self._async_playwright is not None:
+                await self._async_playwright.stop()
+                self._async_playwright = None
+
+
+# Global Playwright manager instance
+playwright_manager = PlaywrightManager()
@@ -0,0 +1,82 @@
+"""
+Rate Limiter for Amazon Requests
+
+This module spaces out requests to Amazon so that searches run as fast as
+Amazon tolerates, and only slows down further once Amazon starts throttling.
+"""
+
+import asyncio
+import threading
+import time
+
+
+# Responses that mean Amazon is throttling us
+THROTTLED_STATUS_CODES = (429, 503)
+
+
+class RateLimiter:
+    """
+    Allows at most one request per interval, backing off exponentially on throttling
+    """
+
+    def __init__(self, interval: float = 1.0, max_backoff: float = 60.0):
+        """
+        Initialize the rate limiter
+
+        Args:
+            interval: Minimum number of seconds between two requests
+            max_backoff: Upper bound in seconds for the throttling backoff
+        """
+        self.interval = interval
+        self.max_backoff = max_backoff
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+        self._blocked_until = 0.0
+        self._consecutive_failures = 0
+
+    def _reserve(self) -> float:
+        """Reserve the next request slot and return how long to wait for it"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot, self._blocked_until)
+            self._next_slot = slot + self.interval
+            return slot - now
+
+    def _is_blocked(self) -> bool:
+        """Whether a throttling backoff started after the caller reserved its slot"""
+        with self._lock:
+            return time.monotonic() < self._blocked_until
+
+    def acquire(self):
+        """Block until the next request may be sent"""
+        while True:
+            delay = self._reserve()
+            if delay > 0:
+                time.sleep(delay)
+            if not self._is_blocked():
+                return
+
+    async def acquire_async(self):
+        """Wait until the next request may be sent without blocking the event loop"""
+        while True:
+            delay = self._reserve()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if not self._is_blocked():
+                return
+
+    def record_throttled(self):
+        """Hold back all requests after a 429/503 response (1s, 2s, 4s, ... up to max_backoff)"""
+        with self._lock:
+            backoff = min(2 ** self._consecutive_failures, self.max_backoff)
+            self._consecutive_failures += 1
+            self._blocked_until = max(self._blocked_until, time.monotonic() + backoff)
+
+    def record_success(self):
+        """Reset the backoff after a successful response"""
+        with self._lock:
+            self._consecutive_failures = 0
+
+
+# Global limiter shared by all Amazon search requests (~1 request/second sustained)
+amazon_rate_limiter = RateLimiter(interval=1.0)
@@ -0,0 +1,40 @@
+"""
+Request Headers for Amazon
+
+This module holds the browser-like request header sets shared by the HTTP
+search, the search browser contexts and the product scraper, handed out
+round-robin so consecutive requests don't all look identical.
+"""
+
+import itertools
+from typing import Dict
+
+
+USER_AGENTS = [
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+]
+
+# Complete request header sets, one per user agent, built once and handed out round-robin
+HEADER_VARIANTS = [
+    {
+        'User-Agent': user_agent,
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
+        'Accept-Language': 'en-US,en;q=0.9',
+        'Accept-Encoding': 'gzip, deflate',
+        'Upgrade-Insecure-Requests': '1'
+    }
+    for user_agent in USER_AGENTS
+]
+header_cycle = itertools.cycle(HEADER_VARIANTS)
+
+# Headers a browser context sets on its own: the user agent is a context option, and
+# Chromium picks Accept / Upgrade-Insecure-Requests per request type, so forcing the
+# document values onto every script, image and XHR would stand out
+BROWSER_MANAGED_HEADERS = ('User-Agent', 'Accept', 'Accept-Encoding', 'Upgrade-Insecure-Requests')
+
+
+def browser_extra_headers(headers: Dict[str, str]) -> Dict[str, str]:
+    """Headers from a header set that a browser context should send on top of its own"""
+    return {name: value for name, value in headers.items() if name not in BROWSER_MANAGED_HEADERS}